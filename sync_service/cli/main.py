@@ -1,117 +1,208 @@
 import os
 import time
+import atexit
 import argparse
 import sys
+import queue
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor
 import multiprocessing
+import threading
 from tqdm import tqdm
-from watchdog.observers import Observer
 
 from ..core.handler import SyncHandler
+from ..core import delta
+from ..core.utils import calculate_file_hashes
 from ..config.config_loader import load_config
-from ..storage.disk_utils import get_mount_point, is_ssd_connected
-
-# Set up logging with timestamps
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("sync.log"), logging.StreamHandler()],
+from ..storage.disk_utils import (
+    get_mount_point,
+    is_ssd_connected,
+    start_disk_monitor,
 )
-
-
-def perform_initial_sync(
-    source_dir, destination_dir, exclude_patterns=None, config=None, dry_run=False
-):
+from ..storage.fast_scan import scan_tree
+from ..storage.native_watcher import get_observer_class
+
+# Set up logging with timestamps. Sync threads only enqueue records; a
+# single listener thread does the formatting and file/console writes so
+# the hot path never blocks on a log flush.
+_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+_file_handler = logging.FileHandler("sync.log")
+_file_handler.setFormatter(_formatter)
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(_formatter)
+
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(
+    _log_queue, _file_handler, _stream_handler, respect_handler_level=True
+)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# Install the queue handler directly (basicConfig would attach its own
+# formatter to it, baking a second format pass into every record)
+_root_logger = logging.getLogger()
+_root_logger.setLevel(logging.INFO)
+_root_logger.addHandler(QueueHandler(_log_queue))
+
+
+def perform_initial_sync(handler):
+    """
+    Bring the destination up to date with the source using the same
+    SyncHandler instance the watcher will keep consuming events with.
+    """
+    source_dir = handler.source_dir
+    destination_dir = handler.destination_dir
     logging.info(f"Starting initial sync from {source_dir} to {destination_dir}")
-    handler = SyncHandler(
-        source_dir, destination_dir, exclude_patterns, config, dry_run
-    )
 
     if not os.path.exists(destination_dir):
-        if not dry_run:
+        if not handler.dry_run:
             os.makedirs(destination_dir, exist_ok=True)
         logging.info(f"Created destination directory: {destination_dir}")
 
-    # First pass: Collect all files and their metadata
-    files_to_sync = []
-    source_files = set()
-
+    # First pass: collect all files with their cached stat results
+    src_map = {}
     with tqdm(desc="Scanning files", unit="files") as scan_pbar:
-        for root, dirs, files in os.walk(source_dir):
-            if config.get("skip_hidden", True):
-                dirs[:] = [d for d in dirs if not d.startswith(".")]
-
-            for file in files:
-                src_file = os.path.join(root, file)
-                if not handler.should_exclude(src_file):
-                    files_to_sync.append(src_file)
-                    source_files.add(os.path.relpath(src_file, source_dir))
-                    scan_pbar.update(1)
+        for rel_path, src_stat in scan_tree(
+            source_dir, skip_hidden=handler._skip_hidden
+        ):
+            if not handler.should_exclude_rel(rel_path):
+                src_map[rel_path] = src_stat
+                scan_pbar.update(1)
+
+    # Scan the destination up front so compare candidates are known
+    # before any copying starts. The trash directory is exempted
+    # explicitly - relying on skip_hidden to match '.trash' would
+    # re-trash (and re-timestamp) its contents on every run whenever the
+    # trash dir isn't hidden or hidden files are scanned
+    trash_prefix = os.path.normpath(handler.conflict_settings["trash_dir"]) + os.sep
+    dst_map = {}
+    with tqdm(desc="Scanning destination", unit="files") as scan_pbar:
+        for rel_path, dest_stat in scan_tree(destination_dir):
+            if rel_path.startswith(trash_prefix):
+                continue
+            if not handler.should_exclude_rel(rel_path):
+                dst_map[rel_path] = dest_stat
+                scan_pbar.update(1)
+
+    # Block-index sidecars describing a file that still exists are
+    # metadata, not synced content; anything else with the suffix is
+    # treated as an ordinary (possibly stale) file
+    for rel_path in [p for p in dst_map if p.endswith(delta.INDEX_SUFFIX)]:
+        if rel_path[: -len(delta.INDEX_SUFFIX)] in dst_map:
+            del dst_map[rel_path]
+
+    # Batch-hash the pairs whose quick check is inconclusive (same size,
+    # drifted mtime), keeping several hash streams busy at once instead
+    # of hashing source and destination one file at a time mid-copy
+    candidates = []
+    for rel_path, src_stat in src_map.items():
+        dest_stat = dst_map.get(rel_path)
+        if dest_stat is not None and handler.needs_content_check(src_stat, dest_stat):
+            candidates.append(os.path.join(source_dir, rel_path))
+            candidates.append(os.path.join(destination_dir, rel_path))
+    if candidates:
+        handler.prime_hashes(
+            calculate_file_hashes(
+                candidates, handler.hash_algorithm, handler.use_hash_cache
+            )
+        )
+
+    # Create every needed destination directory in one pass, shallowest
+    # first, so the copy workers skip the per-file makedirs stat chain
+    if not handler.dry_run:
+        dirs_needed = set()
+        for rel_path in src_map:
+            rel_dir = os.path.dirname(rel_path)
+            while rel_dir and rel_dir not in dirs_needed:
+                dirs_needed.add(rel_dir)
+                rel_dir = os.path.dirname(rel_dir)
+        for rel_dir in sorted(dirs_needed, key=lambda d: d.count(os.sep)):
+            try:
+                os.mkdir(os.path.join(destination_dir, rel_dir))
+            except FileExistsError:
+                pass
+            except OSError as e:
+                logging.warning(f"Cannot create directory {rel_dir}: {e}")
+        handler._dirs_prepared = True
 
     # Define a worker function for parallel processing
-    def sync_worker(src_file):
+    def sync_worker(rel_path, src_stat):
+        src_file = os.path.join(source_dir, rel_path)
         try:
-            handler.sync_file(src_file)
+            handler.sync_file(src_file, src_stat)
             return True
         except Exception as e:
             logging.error(f"Error syncing {src_file}: {e}")
             return False
 
-    # Use ThreadPoolExecutor for I/O-bound operations
+    def delete_worker(rel_path):
+        src_path = os.path.join(source_dir, rel_path)
+        try:
+            handler.handle_delete(src_path)
+            return True
+        except Exception as e:
+            logging.error(f"Error cleaning up {rel_path}: {e}")
+            return False
+
+    # One executor serves both phases, with submissions throttled by a
+    # semaphore so a million-file tree keeps O(workers) futures in memory
+    # instead of materializing one per file up front
     max_workers = min(32, (multiprocessing.cpu_count() * 2))
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        with tqdm(total=len(files_to_sync), desc="Initial sync", unit="files") as pbar:
-            # Submit all tasks
-            future_to_file = {
-                executor.submit(sync_worker, src_file): src_file
-                for src_file in files_to_sync
-            }
-
-            # Process completed tasks
-            for future in as_completed(future_to_file):
-                src_file = future_to_file[future]
-                try:
-                    future.result()
-                except Exception as e:
-                    logging.error(f"Error processing {src_file}: {e}")
-                pbar.update(1)
+    submit_slots = threading.Semaphore(max_workers * 4)
+    pending = 0
+    pending_cond = threading.Condition()
+
+    def submit_throttled(executor, pbar, fn, *args):
+        nonlocal pending
+        submit_slots.acquire()
+        with pending_cond:
+            pending += 1
+
+        def on_done(_future):
+            nonlocal pending
+            submit_slots.release()
+            pbar.update(1)
+            with pending_cond:
+                pending -= 1
+                pending_cond.notify_all()
+
+        executor.submit(fn, *args).add_done_callback(on_done)
+
+    def drain():
+        with pending_cond:
+            while pending:
+                pending_cond.wait()
 
-    # Optimize destination file checking
-    dest_files_to_check = []
-    with tqdm(desc="Scanning destination", unit="files") as scan_pbar:
-        for root, dirs, files in os.walk(destination_dir):
-            for file in files:
-                dest_file = os.path.join(root, file)
-                if not handler.should_exclude(dest_file):
-                    rel_path = os.path.relpath(dest_file, destination_dir)
-                    if rel_path not in source_files:
-                        dest_files_to_check.append((dest_file, rel_path))
-                    scan_pbar.update(1)
-
-    if dest_files_to_check:
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with tqdm(total=len(src_map), desc="Initial sync", unit="files") as pbar:
+            for rel_path, src_stat in src_map.items():
+                submit_throttled(executor, pbar, sync_worker, rel_path, src_stat)
+            drain()
+
+        # Drop any primed digests the compare phase didn't consume (e.g.
+        # a file changed between priming and its worker's quick check):
+        # they describe scan-time content and must not answer for a
+        # later watcher-triggered compare of the same path
+        handler._primed_hashes.clear()
+
+        # Watcher events may hit directories created after this point, so
+        # sync_file goes back to making directories on demand
+        handler._dirs_prepared = False
+
+        # Anything in the destination that has no source counterpart is a
+        # stale file to clean up
+        stale_files = [rel_path for rel_path in dst_map if rel_path not in src_map]
+        if stale_files:
             with tqdm(
-                total=len(dest_files_to_check),
-                desc="Cleaning destination",
-                unit="files",
+                total=len(stale_files), desc="Cleaning destination", unit="files"
             ) as pbar:
+                for rel_path in stale_files:
+                    submit_throttled(executor, pbar, delete_worker, rel_path)
+                drain()
 
-                def delete_worker(file_info):
-                    dest_file, rel_path = file_info
-                    src_path = os.path.join(source_dir, rel_path)
-                    handler.handle_delete(src_path)
-                    return True
-
-                # Submit all delete tasks
-                future_to_file = {
-                    executor.submit(delete_worker, file_info): file_info[0]
-                    for file_info in dest_files_to_check
-                }
-
-                # Process completed tasks
-                for future in as_completed(future_to_file):
-                    pbar.update(1)
+    # Sweep directories emptied by the cleanup in one pass
+    handler.flush_cleanup()
 
     logging.info("Initial sync completed")
 
@@ -135,6 +226,10 @@ def main():
 
     logging.info(f"{'Dry run mode' if args.dry_run else 'Normal mode'}")
 
+    # Event-driven disk notifications where available; polling then hits
+    # the mount cache until a real attach/detach invalidates it
+    start_disk_monitor()
+
     observers = []
     try:
         while True:
@@ -156,16 +251,8 @@ def main():
                         sync_pair_settings = settings.copy()
                         sync_pair_settings["sync_pair_config"] = sync_pair
 
-                        # Perform initial sync with updated settings
-                        perform_initial_sync(
-                            source_dir,
-                            destination_dir,
-                            exclude_patterns=exclude_patterns,
-                            config=sync_pair_settings,
-                            dry_run=args.dry_run,
-                        )
-
-                        # Set up continuous monitoring with updated settings
+                        # One handler serves both the initial sync and the
+                        # watcher, so settings and patterns are prepared once
                         event_handler = SyncHandler(
                             source_dir,
                             destination_dir,
@@ -173,8 +260,11 @@ def main():
                             config=sync_pair_settings,
                             dry_run=args.dry_run,
                         )
+
+                        perform_initial_sync(event_handler)
+
                         logging.info(f"Watching {source_dir} for changes")
-                        observer = Observer()
+                        observer = get_observer_class()()
                         observer.schedule(event_handler, source_dir, recursive=True)
                         logging.info(f"Observer scheduled for {source_dir}")
                         observer.start()
@@ -189,7 +279,7 @@ def main():
             else:
                 try:
                     while any(is_ssd_connected(uuid) for _, uuid in observers):
-                        time.sleep(1)
+                        time.sleep(5)
                 except KeyboardInterrupt:
                     raise
                 finally:
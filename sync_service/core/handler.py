@@ -1,11 +1,75 @@
 import os
+import re
+import sys
+import time
 import shutil
 import logging
+import threading
 from datetime import datetime
-from pathlib import Path
 import fnmatch
+from concurrent.futures import ThreadPoolExecutor
 from watchdog.events import FileSystemEventHandler
-from ..core.utils import calculate_file_hash, log_sync_action
+from ..core.utils import calculate_file_hash, log_sync_action, quick_equal
+from ..core import delta
+
+# Shared pool so source and destination hashes can be computed in
+# parallel when the files live on different devices (thread startup is
+# too expensive to pay per comparison). Each compare sends one side to
+# the pool and hashes the other inline, so the pool is sized to match
+# the initial sync's worker count - otherwise 32 sync workers would
+# funnel through a couple of pool threads and lose their concurrency
+_hash_pool = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 4) * 2),
+    thread_name_prefix="dsync-hash",
+)
+
+# file-to-file sendfile is only supported on Linux
+_HAS_SENDFILE = hasattr(os, "sendfile") and sys.platform.startswith("linux")
+
+# syncfs flushes one whole filesystem; not exposed by the os module on
+# every Python/platform, so fall back to libc on Linux
+if hasattr(os, "syncfs"):
+    _syncfs = os.syncfs
+elif sys.platform.startswith("linux"):
+    try:
+        import ctypes
+
+        _libc = ctypes.CDLL("libc.so.6", use_errno=True)
+
+        def _syncfs(fd):
+            if _libc.syncfs(fd) != 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, os.strerror(errno))
+
+    except OSError:
+        _syncfs = None
+else:
+    _syncfs = None
+
+
+def _fast_copy(src, dst):
+    """
+    Copy src to dst preserving metadata, like shutil.copy2 but using
+    zero-copy os.sendfile where available so the data never bounces
+    through a user-space buffer.
+    """
+    if not _HAS_SENDFILE:
+        shutil.copy2(src, dst)
+        return
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            remaining = os.fstat(fsrc.fileno()).st_size
+            offset = 0
+            while remaining > 0:
+                sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, remaining)
+                if sent == 0:
+                    break
+                offset += sent
+                remaining -= sent
+        shutil.copystat(src, dst)
+    except OSError:
+        # Filesystem without sendfile support; retry the slow path
+        shutil.copy2(src, dst)
 
 
 class SyncHandler(FileSystemEventHandler):
@@ -22,7 +86,67 @@ class SyncHandler(FileSystemEventHandler):
         self.exclude_patterns = exclude_patterns or []
         self.config = config or {}
         self.dry_run = dry_run
-        self.is_syncing = False
+        # Hash algorithm for content comparison (None = best available)
+        self.hash_algorithm = self.config.get("hash_algorithm")
+        # Persistent fingerprint cache (settings.hash_cache) lets repeat
+        # sweeps skip re-reading unchanged files
+        self.use_hash_cache = bool(self.config.get("hash_cache", True))
+        # 'quick' trusts matching size+mtime; 'checksum' always verifies
+        # content when sizes match
+        self._compare_mode = self.config.get("compare_mode", "quick")
+
+        # Cache per-event settings once; dict lookups per watched file add up
+        self._skip_hidden = bool(self.config.get("skip_hidden", True))
+        self._cleanup_empty = bool(self.config.get("cleanup_empty_dirs", True))
+
+        # Block-level delta copies for large modified files (opt-in)
+        self._delta_enabled = bool(self.config.get("delta_sync", False))
+
+        # Durable mode: flush the destination filesystem once per batch
+        # of copies (settings.fsync_batch) via syncfs, amortizing journal
+        # commits and device cache flushes; an unclean shutdown may lose
+        # up to fsync_batch-1 files, matching rsync's default stance
+        self._durable = bool(self.config.get("durable", False))
+        self._fsync_batch = int(self.config.get("fsync_batch", 64))
+        self._files_since_sync = 0
+
+        # Digests computed in batch by the initial-sync scanner, consumed
+        # once each by files_are_identical
+        self._primed_hashes = {}
+
+        # Set by the initial sync while every destination directory is
+        # known to exist, letting sync_file skip its per-file makedirs
+        self._dirs_prepared = False
+
+        # Editors fire several modify events per save; collapse bursts for
+        # the same path into a single sync after a short quiet period.
+        # One dispatcher thread drains the pending map, so a mass-change
+        # burst costs one thread rather than one per file
+        self.debounce_ms = self.config.get("debounce_ms", 250)
+        self._pending_syncs = {}  # src_path -> monotonic deadline
+        self._pending_lock = threading.Lock()
+        self._pending_wakeup = threading.Condition(self._pending_lock)
+        self._dispatch_thread = None
+
+        # Directories that may have been emptied by deletions, swept in
+        # one batch instead of re-walking ancestors per delete
+        self._dirty_dirs = set()
+        self._cleanup_timer = None
+
+        # Precompute hot-path state for should_exclude: it runs for every
+        # scanned and every watched file
+        self._source_prefix = self.source_dir + os.sep
+        # All patterns fold into one alternation, so a miss costs a single
+        # match over the path instead of one Python-level call per pattern
+        if self.exclude_patterns:
+            self._exclude_match = re.compile(
+                "|".join(
+                    f"(?:{fnmatch.translate(pattern)})"
+                    for pattern in self.exclude_patterns
+                )
+            ).match
+        else:
+            self._exclude_match = None
 
         # Get conflict resolution settings with defaults
         self.conflict_settings = {
@@ -37,19 +161,70 @@ class SyncHandler(FileSystemEventHandler):
         self.conflict_settings.update(
             self.config.get("sync_pair_config", {}).get("conflict_resolution", {})
         )
+        self._mod_policy = self.conflict_settings["modified_files"]
+        self._del_policy = self.conflict_settings["deleted_files"]
 
     def on_created(self, event):
-        if event.is_directory or self.is_syncing:
+        if event.is_directory:
             return
-        self.sync_file(event.src_path)
+        self._schedule_sync(event.src_path)
 
     def on_modified(self, event):
-        if event.is_directory or self.is_syncing:
+        if event.is_directory:
             return
-        self.sync_file(event.src_path)
+        self._schedule_sync(event.src_path)
+
+    def _schedule_sync(self, src_path):
+        """
+        Debounce watcher events: push the path's deadline out by the
+        quiet period so a burst of events triggers a single hash+sync
+        once writes settle. Events are never dropped - rescheduling a
+        path that is already pending just moves its deadline.
+        """
+        if self.debounce_ms <= 0:
+            self.sync_file(src_path)
+            return
+        with self._pending_wakeup:
+            self._pending_syncs[src_path] = time.monotonic() + self.debounce_ms / 1000.0
+            if self._dispatch_thread is None:
+                self._dispatch_thread = threading.Thread(
+                    target=self._dispatch_pending,
+                    name="dsync-debounce",
+                    daemon=True,
+                )
+                self._dispatch_thread.start()
+            self._pending_wakeup.notify()
+
+    def _dispatch_pending(self):
+        """
+        Dispatcher loop: sleep until the earliest pending deadline, then
+        sync every path whose quiet period has elapsed.
+        """
+        while True:
+            with self._pending_wakeup:
+                while not self._pending_syncs:
+                    self._pending_wakeup.wait()
+                now = time.monotonic()
+                due = [
+                    path
+                    for path, deadline in self._pending_syncs.items()
+                    if deadline <= now
+                ]
+                if not due:
+                    self._pending_wakeup.wait(min(self._pending_syncs.values()) - now)
+                    continue
+                for path in due:
+                    del self._pending_syncs[path]
+            for src_path in due:
+                try:
+                    self.sync_file(src_path)
+                except Exception as e:
+                    # Anything escaping here would kill the dispatcher
+                    # thread and black-hole every later event
+                    logging.error(f"Error syncing {src_path}: {e}")
 
     def on_moved(self, event):
-        if event.is_directory or self.is_syncing:
+        if event.is_directory:
             return
         # Handle the deletion of the old file
         self.handle_delete(event.src_path)
@@ -58,36 +233,98 @@ class SyncHandler(FileSystemEventHandler):
             self.sync_file(event.dest_path)
 
     def on_deleted(self, event):
-        if event.is_directory or self.is_syncing:
+        if event.is_directory:
             return
         self.handle_delete(event.src_path)
 
     def should_exclude(self, path):
         """
-        Check if a file should be excluded based on patterns and settings.
+        Check if a file under the source tree should be excluded based
+        on patterns and settings.
         """
-        relative_path = os.path.relpath(path, self.source_dir)
+        # Fast path: one slice instead of relpath's normalize/split work
+        if path.startswith(self._source_prefix):
+            relative_path = path[len(self._source_prefix) :]
+        else:
+            relative_path = os.path.relpath(path, self.source_dir)
+        return self.should_exclude_rel(relative_path)
 
+    def should_exclude_rel(self, relative_path):
+        """
+        Exclusion check on an already-relative path. Destination scans
+        must use this directly: relpathing a destination file against
+        the source tree yields '..' components, which the hidden-file
+        check would treat as hidden and exclude everything.
+        """
         # Check if should skip hidden files
-        if self.config.get("skip_hidden", True) and any(
-            part.startswith(".") for part in Path(relative_path).parts
+        if self._skip_hidden and any(
+            part.startswith(".") for part in relative_path.split(os.sep)
         ):
             return True
 
         # Check exclude patterns
-        return any(
-            fnmatch.fnmatch(relative_path, pattern) for pattern in self.exclude_patterns
-        )
+        if self._exclude_match is None:
+            return False
+        return self._exclude_match(relative_path) is not None
+
+    def needs_content_check(self, stat1, stat2):
+        """
+        True when the quick check alone can't settle whether two files
+        are equal (or checksum mode insists on verifying content).
+        """
+        quick = quick_equal(stat1, stat2)
+        if quick is False:
+            return False
+        return quick is None or self._compare_mode == "checksum"
 
-    def files_are_identical(self, file1, file2):
+    def files_are_identical(self, file1, file2, stat1=None, stat2=None):
         """
-        Compare two files using their hashes.
+        Compare two files, short-circuiting with a size+mtime quick check
+        before falling back to full content hashes.
         """
         try:
-            return calculate_file_hash(file1) == calculate_file_hash(file2)
+            if stat1 is None:
+                stat1 = os.stat(file1)
+            if stat2 is None:
+                stat2 = os.stat(file2)
+            quick = quick_equal(stat1, stat2)
+            if quick is False:
+                return False
+            if quick is True and self._compare_mode != "checksum":
+                return True
+            hash1 = self._primed_hashes.pop(file1, None)
+            hash2 = self._primed_hashes.pop(file2, None)
+            if hash1 is None and hash2 is None and stat1.st_dev != stat2.st_dev:
+                # Different devices: overlap the two reads. The far side
+                # goes to the pool while this thread hashes the near
+                # side, so the calling thread always contributes a
+                # stream even when the pool is saturated
+                future2 = _hash_pool.submit(
+                    calculate_file_hash,
+                    file2,
+                    self.hash_algorithm,
+                    self.use_hash_cache,
+                )
+                hash1 = calculate_file_hash(
+                    file1, self.hash_algorithm, self.use_hash_cache
+                )
+                return hash1 == future2.result()
+            if hash1 is None:
+                hash1 = calculate_file_hash(
+                    file1, self.hash_algorithm, self.use_hash_cache
+                )
+            if hash2 is None:
+                hash2 = calculate_file_hash(
+                    file2, self.hash_algorithm, self.use_hash_cache
+                )
+            return hash1 == hash2
         except OSError:
             return False
 
+    def prime_hashes(self, hashes):
+        """Seed digests that were computed in batch by the scanner."""
+        self._primed_hashes.update(hashes)
+
     def get_trash_path(self, filename):
         trash_dir = os.path.join(
             self.destination_dir, self.conflict_settings["trash_dir"]
@@ -109,100 +346,180 @@ class SyncHandler(FileSystemEventHandler):
         )
         return os.path.join(os.path.dirname(dest_path), new_name)
 
-    def cleanup_empty_dirs(self, directory):
+    def _mark_dirty_dir(self, directory):
         """
-        Recursively remove empty directories starting from the given directory.
+        Record a directory that may have been emptied by a deletion and
+        (re)arm a short timer so a burst of deletes is swept once.
         """
-        if not os.path.exists(directory):
-            return
+        with self._pending_lock:
+            self._dirty_dirs.add(directory)
+            if self.debounce_ms > 0:
+                if self._cleanup_timer is not None:
+                    self._cleanup_timer.cancel()
+                self._cleanup_timer = threading.Timer(
+                    self.debounce_ms / 1000.0, self.flush_cleanup
+                )
+                self._cleanup_timer.daemon = True
+                self._cleanup_timer.start()
+        if self.debounce_ms <= 0:
+            self.flush_cleanup()
 
-        # Don't delete the root destination directory
-        if directory == self.destination_dir:
-            return
+    def flush_cleanup(self):
+        """
+        Remove empty directories recorded since the last sweep, deepest
+        first, walking up through parents that become empty - one readdir
+        per unique directory instead of one per delete per ancestor.
+        """
+        with self._pending_lock:
+            self._cleanup_timer = None
+            dirty, self._dirty_dirs = self._dirty_dirs, set()
+
+        dest_prefix = self.destination_dir + os.sep
+        for directory in sorted(dirty, key=lambda d: d.count(os.sep), reverse=True):
+            # Never delete the destination root or anything outside it
+            while directory.startswith(dest_prefix):
+                try:
+                    if os.listdir(directory):
+                        break
+                    os.rmdir(directory)
+                    logging.info(
+                        f"Removed empty directory: "
+                        f"{os.path.relpath(directory, self.destination_dir)}"
+                    )
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
 
+    def _copy_update(self, src_path, dest_path):
+        """
+        Overwrite an existing destination file, rewriting only changed
+        blocks when delta sync is enabled and an index exists.
+        """
+        if self._delta_enabled:
+            written = delta.delta_copy(src_path, dest_path, self.hash_algorithm)
+            if written is not None:
+                logging.debug(f"Delta copy rewrote {written} bytes of {dest_path}")
+                return
+        _fast_copy(src_path, dest_path)
+        if self._delta_enabled:
+            delta.update_index(dest_path, self.hash_algorithm)
+
+    def _note_copied(self):
+        """
+        Count a completed copy and, in durable mode, flush the whole
+        destination filesystem once per batch - one device cache flush
+        covers every pending write instead of one fsync per file.
+        """
+        if not self._durable or _syncfs is None:
+            return
+        with self._pending_lock:
+            self._files_since_sync += 1
+            if self._files_since_sync < self._fsync_batch:
+                return
+            self._files_since_sync = 0
         try:
-            # Check if directory is empty
-            if not os.listdir(directory):
-                os.rmdir(directory)
-                logging.info(
-                    f"Removed empty directory: {os.path.relpath(directory, self.destination_dir)}"
-                )
-                # Recursively check parent directory
-                self.cleanup_empty_dirs(os.path.dirname(directory))
-        except OSError:
-            # Handle any permissions or other OS errors
-            pass
+            fd = os.open(self.destination_dir, os.O_RDONLY)
+            try:
+                _syncfs(fd)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logging.warning(f"syncfs on {self.destination_dir} failed: {e}")
+
+    def sync_file(self, src_path, src_stat=None):
+        rel_path = os.path.relpath(src_path, self.source_dir)
+        dest_path = os.path.join(self.destination_dir, rel_path)
+
+        # Skip excluded files
+        if self.should_exclude(src_path):
+            return
 
-    def sync_file(self, src_path):
+        # One stat per side (reusing a stat cached by the scanner if
+        # given), carried through the branches below; a missing
+        # destination is signalled by the stat itself rather than a
+        # separate exists() round trip
         try:
-            self.is_syncing = True
-            rel_path = os.path.relpath(src_path, self.source_dir)
-            dest_path = os.path.join(self.destination_dir, rel_path)
+            dest_stat = os.stat(dest_path)
+        except FileNotFoundError:
+            dest_stat = None
+        if dest_stat is not None and src_stat is None:
+            try:
+                src_stat = os.stat(src_path)
+            except FileNotFoundError:
+                return  # source vanished mid-event; a delete will follow
 
-            # Skip excluded files
-            if self.should_exclude(src_path):
+        if dest_stat is not None:
+            if self.files_are_identical(src_path, dest_path, src_stat, dest_stat):
                 return
 
-            if os.path.exists(dest_path):
-                if self.files_are_identical(src_path, dest_path):
-                    return
-
-                if self.conflict_settings["modified_files"] == "keep_both":
-                    # Create a new copy with timestamp
-                    new_dest_path = self.get_duplicate_path(dest_path)
-                    if self.dry_run:
-                        log_sync_action(
-                            "Would create new version", src_path, new_dest_path
-                        )
-                    else:
+            if self._mod_policy == "keep_both":
+                # Create a new copy with timestamp
+                new_dest_path = self.get_duplicate_path(dest_path)
+                if self.dry_run:
+                    log_sync_action("Would create new version", src_path, new_dest_path)
+                else:
+                    if not self._dirs_prepared:
                         os.makedirs(os.path.dirname(new_dest_path), exist_ok=True)
-                        shutil.copy2(src_path, new_dest_path)
-                        log_sync_action("Created new version", src_path, new_dest_path)
-                elif self.conflict_settings["modified_files"] == "keep_newest":
-                    if os.path.getmtime(src_path) > os.path.getmtime(dest_path):
-                        if not self.dry_run:
-                            shutil.copy2(src_path, dest_path)
-                            log_sync_action("Updated (newer)", src_path, dest_path)
-                else:  # 'overwrite'
+                    _fast_copy(src_path, new_dest_path)
+                    self._note_copied()
+                    log_sync_action("Created new version", src_path, new_dest_path)
+            elif self._mod_policy == "keep_newest":
+                if src_stat.st_mtime > dest_stat.st_mtime:
                     if not self.dry_run:
-                        shutil.copy2(src_path, dest_path)
-                        log_sync_action("Updated", src_path, dest_path)
-                    else:
-                        log_sync_action("Would sync", src_path, dest_path)
-            else:
+                        self._copy_update(src_path, dest_path)
+                        self._note_copied()
+                        log_sync_action(
+                            "Updated (newer)", src_path, dest_path, level=logging.DEBUG
+                        )
+            else:  # 'overwrite'
+                if not self.dry_run:
+                    self._copy_update(src_path, dest_path)
+                    self._note_copied()
+                    log_sync_action("Updated", src_path, dest_path, level=logging.DEBUG)
+                else:
+                    log_sync_action("Would sync", src_path, dest_path)
+        else:
+            if not self._dirs_prepared:
                 os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-                shutil.copy2(src_path, dest_path)
-                log_sync_action("Synced", src_path, dest_path)
-        finally:
-            self.is_syncing = False
+            _fast_copy(src_path, dest_path)
+            if self._delta_enabled:
+                delta.update_index(dest_path, self.hash_algorithm)
+            self._note_copied()
+            log_sync_action("Synced", src_path, dest_path, level=logging.DEBUG)
 
     def handle_delete(self, src_path):
-        try:
-            self.is_syncing = True
-            rel_path = os.path.relpath(src_path, self.source_dir)
-            dest_path = os.path.join(self.destination_dir, rel_path)
+        rel_path = os.path.relpath(src_path, self.source_dir)
+        dest_path = os.path.join(self.destination_dir, rel_path)
 
-            if not os.path.exists(dest_path):
-                return
+        if not os.path.exists(dest_path):
+            return
 
-            if self.dry_run:
-                log_sync_action("Would handle deletion", src_path, dest_path)
-                return
+        if self.dry_run:
+            log_sync_action("Would handle deletion", src_path, dest_path)
+            return
 
-            if self.conflict_settings["deleted_files"] == "trash":
-                # Move to trash
-                trash_path = self.get_trash_path(os.path.basename(dest_path))
-                os.makedirs(os.path.dirname(trash_path), exist_ok=True)
+        if self._del_policy == "trash":
+            # Move to trash
+            trash_path = self.get_trash_path(os.path.basename(dest_path))
+            os.makedirs(os.path.dirname(trash_path), exist_ok=True)
+            try:
+                # The trash lives on the destination volume, so this is
+                # normally an O(1) rename instead of a copy+unlink
+                os.replace(dest_path, trash_path)
+            except OSError:
+                # Cross-device trash dir (EXDEV): fall back to copying
                 shutil.move(dest_path, trash_path)
-                log_sync_action("Moved to trash", dest_path, trash_path)
-            elif self.conflict_settings["deleted_files"] == "delete":
-                # Delete permanently
-                os.remove(dest_path)
-                log_sync_action("Deleted", dest_path, details="permanent deletion")
-            # If 'keep', do nothing
-
-            # Clean up empty directories if configured
-            if self.config.get("cleanup_empty_dirs", True):
-                self.cleanup_empty_dirs(os.path.dirname(dest_path))
-        finally:
-            self.is_syncing = False
+            log_sync_action("Moved to trash", dest_path, trash_path)
+        elif self._del_policy == "delete":
+            # Delete permanently
+            os.remove(dest_path)
+            log_sync_action("Deleted", dest_path, details="permanent deletion")
+        # If 'keep', do nothing
+
+        # Drop any block index left behind for the removed file
+        if self._delta_enabled:
+            delta.remove_index(dest_path)
+
+        # Clean up empty directories if configured
+        if self._cleanup_empty:
+            self._mark_dirty_dir(os.path.dirname(dest_path))
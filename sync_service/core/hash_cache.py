@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import logging
+import threading
+
+CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "dsync",
+    "hashcache.db",
+)
+
+
+class HashCache:
+    """
+    Persistent (device, inode) -> digest cache so files that haven't
+    changed since the last sweep cost one stat instead of a full
+    re-read. An entry only answers while the recorded size and mtime_ns
+    still match the file's stat, rsync/borg style.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        # sqlite connections can't be shared across threads
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            # It's only a cache: trade crash durability for not paying
+            # an fsync-bound commit per stored digest
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS hashes ("
+                "  dev INTEGER NOT NULL,"
+                "  ino INTEGER NOT NULL,"
+                "  algorithm TEXT NOT NULL,"
+                "  size INTEGER NOT NULL,"
+                "  mtime_ns INTEGER NOT NULL,"
+                "  digest TEXT NOT NULL,"
+                "  PRIMARY KEY (dev, ino, algorithm)"
+                ")"
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, file_stat, algorithm):
+        """Return the cached digest, or None when absent or stale."""
+        try:
+            row = (
+                self._conn()
+                .execute(
+                    "SELECT size, mtime_ns, digest FROM hashes"
+                    " WHERE dev = ? AND ino = ? AND algorithm = ?",
+                    (file_stat.st_dev, file_stat.st_ino, algorithm),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            logging.debug(f"Hash cache lookup failed: {e}")
+            return None
+        if row and row[0] == file_stat.st_size and row[1] == file_stat.st_mtime_ns:
+            return row[2]
+        return None
+
+    def put(self, file_stat, algorithm, digest):
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    file_stat.st_dev,
+                    file_stat.st_ino,
+                    algorithm,
+                    file_stat.st_size,
+                    file_stat.st_mtime_ns,
+                    digest,
+                ),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.debug(f"Hash cache store failed: {e}")
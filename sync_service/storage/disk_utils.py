@@ -1,21 +1,130 @@
+import time
+import plistlib
+import threading
 import subprocess
 import logging
 
+# Direct DiskArbitration lookups (optional pyobjc dependency) avoid the
+# fork/exec of a diskutil process plus a plist parse on every query
+try:
+    from CoreFoundation import (
+        CFUUIDCreateFromString,
+        CFRunLoopGetCurrent,
+        CFRunLoopRun,
+        kCFRunLoopDefaultMode,
+    )
+    from DiskArbitration import (
+        DASessionCreate,
+        DADiskCreateFromVolumeUUID,
+        DADiskCopyDescription,
+        DARegisterDiskAppearedCallback,
+        DARegisterDiskDisappearedCallback,
+        DASessionScheduleWithRunLoop,
+        kDADiskDescriptionVolumePathKey,
+    )
+
+    _da_session = DASessionCreate(None)
+except ImportError:
+    _da_session = None
+
+_da_monitor_started = False
+
+# Mount points change rarely, but the connection monitor polls every few
+# seconds and each query forks a diskutil process; cache lookups briefly
+# so steady-state polling is a dict hit instead of a process spawn.
+# With DiskArbitration available queries are cheap CF calls, so a short
+# TTL keeps attach/detach latency low
+MOUNT_CACHE_TTL = 2.0 if _da_session is not None else 10.0
+_mount_cache = {}
+
+
+def invalidate_mount_cache(uuid=None):
+    """
+    Drop cached mount lookups so the next query hits the system again -
+    called when a disk-appeared/disappeared notification arrives.
+    """
+    if uuid is None:
+        _mount_cache.clear()
+    else:
+        _mount_cache.pop(uuid, None)
+
 
 def get_mount_point(uuid):
+    cached = _mount_cache.get(uuid)
+    now = time.monotonic()
+    # With the event monitor running, cache entries stay valid until a
+    # disk appeared/disappeared notification invalidates them
+    if cached is not None and (_da_monitor_started or now < cached[0]):
+        return cached[1]
+    mount_point = _query_mount_point(uuid)
+    _mount_cache[uuid] = (now + MOUNT_CACHE_TTL, mount_point)
+    return mount_point
+
+
+def _query_mount_point(uuid):
+    if _da_session is not None:
+        return _query_mount_point_da(uuid)
+    return _query_mount_point_diskutil(uuid)
+
+
+def _query_mount_point_da(uuid):
+    try:
+        cf_uuid = CFUUIDCreateFromString(None, uuid)
+        disk = DADiskCreateFromVolumeUUID(None, _da_session, cf_uuid)
+        if disk is None:
+            return None
+        description = DADiskCopyDescription(disk)
+        if not description:
+            return None
+        volume_path = description.get(kDADiskDescriptionVolumePathKey)
+        if volume_path is None:
+            return None
+        return volume_path.path()
+    except Exception as e:
+        logging.error(f"Error getting mount point via DiskArbitration: {e}")
+    return None
+
+
+def _query_mount_point_diskutil(uuid):
     try:
+        # Keep stdout as bytes; plistlib parses them directly, avoiding
+        # a decode/encode round trip per query
         result = subprocess.run(
-            ["diskutil", "info", "-plist", uuid], capture_output=True, text=True
+            ["diskutil", "info", "-plist", uuid], capture_output=True
         )
         if result.returncode == 0:
-            import plistlib
-
-            plist = plistlib.loads(result.stdout.encode("utf-8"))
+            plist = plistlib.loads(result.stdout)
             return plist.get("MountPoint")
     except Exception as e:
         logging.error(f"Error getting mount point: {e}")
     return None
 
 
+def start_disk_monitor():
+    """
+    Subscribe to DiskArbitration appeared/disappeared notifications on a
+    daemon CFRunLoop thread so attach/detach invalidates the mount cache
+    within milliseconds; queries then never wait out a TTL and idle
+    polling is a pure dict lookup. No-op where pyobjc is unavailable.
+    """
+    global _da_monitor_started
+    if _da_session is None or _da_monitor_started:
+        return
+    _da_monitor_started = True
+
+    def _on_disk_change(disk, context=None):
+        invalidate_mount_cache()
+
+    def _run():
+        DARegisterDiskAppearedCallback(_da_session, None, _on_disk_change, None)
+        DARegisterDiskDisappearedCallback(_da_session, None, _on_disk_change, None)
+        DASessionScheduleWithRunLoop(
+            _da_session, CFRunLoopGetCurrent(), kCFRunLoopDefaultMode
+        )
+        CFRunLoopRun()
+
+    threading.Thread(target=_run, name="dsync-diskmon", daemon=True).start()
+
+
 def is_ssd_connected(uuid):
     return get_mount_point(uuid) is not None
@@ -0,0 +1,53 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of directory reads kept in flight; mirrors the queue depth a
+# batched getdents64 walker would use
+SCAN_WORKERS = 8
+
+
+def _scan_one(root, rel_dir):
+    """Read a single directory, returning its subdirectories and files."""
+    abs_dir = os.path.join(root, rel_dir) if rel_dir else root
+    subdirs = []
+    files = []
+    try:
+        with os.scandir(abs_dir) as entries:
+            for entry in entries:
+                rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(rel_path)
+                elif entry.is_file():
+                    try:
+                        files.append((rel_path, entry.stat()))
+                    except OSError:
+                        continue  # vanished between scandir and stat
+    except OSError as e:
+        logging.warning(f"Cannot scan directory {abs_dir}: {e}")
+    return subdirs, files
+
+
+def scan_tree(root, skip_hidden=False):
+    """
+    Yield (relative_path, stat_result) for every file under root.
+
+    Directories at the same depth are read concurrently so the storage
+    device sees several outstanding metadata requests instead of the
+    strictly sequential getdents/stat chain a recursive walk issues;
+    readdir and stat release the GIL, so a small thread pool is enough
+    to saturate queue depth on external/network storage.
+    """
+    pending = [""]
+    with ThreadPoolExecutor(
+        max_workers=SCAN_WORKERS, thread_name_prefix="dsync-scan"
+    ) as executor:
+        while pending:
+            level, pending = pending, []
+            for subdirs, files in executor.map(
+                lambda rel_dir: _scan_one(root, rel_dir), level
+            ):
+                for rel_path in subdirs:
+                    if not (skip_hidden and os.path.basename(rel_path).startswith(".")):
+                        pending.append(rel_path)
+                yield from files
@@ -0,0 +1,33 @@
+import sys
+import logging
+
+from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
+
+
+def get_observer_class():
+    """
+    Pick the watcher backend explicitly: FSEvents on macOS (the kernel
+    coalesces event bursts per directory) and inotify on Linux, instead
+    of trusting watchdog's auto-detection. If neither native backend
+    imports, watchdog's default still works, but a silent fall-through
+    to the polling observer - periodic full rescans - is worth a loud
+    warning on trees this tool is meant for.
+    """
+    try:
+        if sys.platform == "darwin":
+            from watchdog.observers.fsevents import FSEventsObserver
+
+            return FSEventsObserver
+        if sys.platform.startswith("linux"):
+            from watchdog.observers.inotify import InotifyObserver
+
+            return InotifyObserver
+    except ImportError as e:
+        logging.warning(f"Native watcher backend unavailable ({e})")
+    if Observer is PollingObserver:
+        logging.warning(
+            "Falling back to the polling observer; changes will be "
+            "detected by periodic rescans"
+        )
+    return Observer